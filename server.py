@@ -1,17 +1,40 @@
-from typing import Any
+from typing import Any, AsyncIterator, Callable, Iterator
+from contextlib import AsyncExitStack, asynccontextmanager
+import asyncio
+import math
 import os
+import re
+import time
 import httpx
+import ijson
+import orjson
+from diskcache import Cache
 from dotenv import load_dotenv
+from httpx_limiter import AbstractAsyncLimiter, AsyncRateLimitedTransport, Rate
+from httpx_limiter.pyrate import PyrateAsyncLimiter
 from mcp.server.fastmcp import FastMCP
 
+try:
+    import rusty_req
+except ImportError:
+    rusty_req = None
+
 # Load environment variables
 load_dotenv()
 
-# Initialize FastMCP server
-mcp = FastMCP("riot")
-
 # Constants
 RIOT_API_KEY = os.environ.get("RIOT_API_KEY")
+MAX_CONNECTIONS = int(os.environ.get("RIOT_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("RIOT_MAX_KEEPALIVE_CONNECTIONS", "20"))
+STALE_WINDOW = float(os.environ.get("RIOT_STALE_WINDOW", "600"))
+HTTP_BACKEND = os.environ.get("RIOT_HTTP_BACKEND", "httpx")  # "httpx" or "aiohttp"
+CACHE_DIR = os.path.expanduser(os.environ.get("RIOT_CACHE_DIR", "~/.cache/lolmcp"))
+# Riot's development key limits, raise them for a production key
+RATE_LIMIT_PER_SECOND = int(os.environ.get("RIOT_RATE_LIMIT_PER_SECOND", "20"))
+RATE_LIMIT_PER_2_MINUTES = int(os.environ.get("RIOT_RATE_LIMIT_PER_2_MINUTES", "100"))
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.3  # seconds, doubled on every attempt
+MAX_RETRY_WAIT = 10.0  # longest Retry-After we are willing to sleep through
 
 REGIONAL_URLS = {
     "na": "https://americas.api.riotgames.com",
@@ -29,41 +52,336 @@ PLATFORM_URLS = {
     "jp": "https://jp1.api.riotgames.com",
 }
 
-async def riot_req(url: str) ->dict[str,Any]|None:
-    headers = {"X-Riot-Token": RIOT_API_KEY}
-    async with httpx.AsyncClient() as client:
+# Checked before any request so a made up region or match id never costs a round trip
+_REGIONS = frozenset(REGIONAL_URLS)
+_INVALID_REGION = f"Invalid region, use one of: {', '.join(REGIONAL_URLS)}"
+_MATCH_RE = re.compile(r"[A-Z]{2,4}\d?_\d+", re.IGNORECASE)  # e.g. EUW1_7012345678, KR_7012345678
+_INVALID_MATCH_ID = "Invalid match id, it should look like EUW1_7012345678"
+
+_LIMITS = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS)
+
+def _make_transport() -> httpx.AsyncBaseTransport:
+    if HTTP_BACKEND == "aiohttp":
+        # Holds up better than the default backend when asked for dozens of matches at once, but only speaks HTTP/1.1
+        from httpx_aiohttp import AiohttpTransport
+        return AiohttpTransport(limits=_LIMITS)
+    # With HTTP/2 the concurrent requests of get_player_summary share a single connection per Riot host
+    return httpx.AsyncHTTPTransport(http2=True, limits=_LIMITS)
+
+class _RiotRateLimiter(AbstractAsyncLimiter):
+    """Sliding window limiter over both Riot windows, no window ever lets more than its quota through.
+
+    pyrate-limiter's async bucket needs a running event loop, so it is only built on first use.
+    """
+    def __init__(self, *rates: Rate):
+        self._rates = rates
+        self._limiter: PyrateAsyncLimiter | None = None
+
+    async def __aenter__(self) -> "_RiotRateLimiter":
+        if self._limiter is None:
+            self._limiter = PyrateAsyncLimiter.create(*self._rates)
+        await self._limiter.__aenter__()
+        return self
+
+# Requests queue here instead of going out and coming back as 429s
+_RATE_LIMITER = _RiotRateLimiter(
+    Rate.create(RATE_LIMIT_PER_SECOND, 1),
+    Rate.create(RATE_LIMIT_PER_2_MINUTES, 120),
+)
+
+async def _acquire_rate_limit() -> None:
+    # For requests that do not go through _CLIENT
+    async with _RATE_LIMITER:
+        pass
+
+def _rate_limited(transport: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    return AsyncRateLimitedTransport(limiter=_RATE_LIMITER, transport=transport)
+
+_TRANSPORT = _make_transport()
+# One client for the whole server so connections (and their TLS sessions) are reused between tool calls
+_CLIENT = httpx.AsyncClient(
+    headers={"X-Riot-Token": RIOT_API_KEY or "", "Accept-Encoding": "gzip, br"},
+    timeout=30.0,
+    transport=_rate_limited(_TRANSPORT),
+)
+
+# url -> (fresh_until, stale_until, json). Only successful responses are stored.
+# Kept on disk so a new Claude session does not have to download the same matches again
+_CACHE = Cache(CACHE_DIR)
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    try:
+        yield
+    finally:
+        await _CLIENT.aclose()
+        await _TRANSPORT.aclose()  # the rate limiting wrappers do not close what they wrap
+        _CACHE.close()
+
+# Initialize FastMCP server
+mcp = FastMCP("riot", lifespan=lifespan)
+
+# One lock per url so concurrent calls for the same resource share a single request
+_LOCKS: dict[str, asyncio.Lock] = {}
+# Callers holding or waiting on each lock in _LOCKS, the lock is dropped when nobody needs it anymore
+_LOCK_USERS: dict[str, int] = {}
+# Background refreshes of stale entries, at most one per url
+_REFRESHES: dict[str, asyncio.Task] = {}
+
+def _cache_policy(url: str) -> tuple[float, float]:
+    """Returns (ttl, stale window) in seconds for the url."""
+    # Order matters: the match list url also contains /matches/
+    if "/champion-mastery/" in url:
+        return 120.0, STALE_WINDOW
+    if url.split("?")[0].endswith("/ids"):
+        return 30.0, STALE_WINDOW
+    if "/accounts/" in url:
+        return 300.0, 0.0
+    if "/matches/" in url:
+        return math.inf, 0.0  # finished matches and their timelines never change
+    return 0.0, 0.0
+
+_STATUS_MESSAGES = {
+    404: "Resource not found",
+    403: "Invalid or expired API key.",
+    401: "Unauthorized. Check your API key.",
+}
+
+class RiotError(Exception):
+    """A Riot API request that failed, message is meant to be shown to the user as is."""
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+_MISS = object()
+
+def _from_cache(url: str) -> Any:
+    """The cached JSON for url, or _MISS. A stale entry is still returned while a background refresh runs."""
+    entry = _CACHE.get(url)
+    if entry:
+        fresh_until, stale_until, data = entry
+        now = time.time()
+        if now < fresh_until:
+            return data
+        if now < stale_until:
+            # Serve the stale copy right away and refresh it in the background
+            if url not in _REFRESHES:
+                task = asyncio.create_task(_refresh(url))
+                _REFRESHES[url] = task
+                task.add_done_callback(lambda _: _REFRESHES.pop(url, None))
+            return data
+    return _MISS
+
+async def riot_req(url: str) -> Any:
+    """Returns the decoded JSON of the url or raises RiotError."""
+    data = _from_cache(url)
+    if data is _MISS:
+        data = await _load(url)
+    return data
+
+async def _refresh(url: str) -> None:
+    try:
+        await _load(url)
+    except RiotError:
+        pass  # keep serving the stale copy, the next call tries again
+
+@asynccontextmanager
+async def _url_lock(url: str) -> AsyncIterator[None]:
+    lock = _LOCKS.setdefault(url, asyncio.Lock())
+    _LOCK_USERS[url] = _LOCK_USERS.get(url, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        # A released lock can still have waiters, only forget it once the last of them is done
+        _LOCK_USERS[url] -= 1
+        if not _LOCK_USERS[url]:
+            del _LOCK_USERS[url], _LOCKS[url]
+
+async def _load(url: str) -> Any:
+    async with _url_lock(url):
+        # Another caller may have filled the cache while we waited for the lock
+        entry = _CACHE.get(url)
+        if entry and entry[0] > time.time():
+            return entry[2]
+        data = await _fetch(url)
+        _store(url, data)
+        return data
+
+def _store(url: str, data: Any) -> None:
+    ttl, stale = _cache_policy(url)
+    if ttl:
+        now = time.time()
+        # Let diskcache evict the entry once it is past its stale window
+        expire = None if math.isinf(ttl) else ttl + stale
+        _CACHE.set(url, (now + ttl, now + ttl + stale, data), expire=expire)
+
+async def _riot_req_or_error(url: str) -> Any:
+    try:
+        return await riot_req(url)
+    except RiotError as e:
+        return e
+
+async def riot_req_many(urls: list[str]) -> list[Any]:
+    """riot_req for many urls at once, in the same order. Failed urls get their RiotError instead of raising."""
+    return await asyncio.gather(*(_riot_req_or_error(url) for url in urls))
+
+async def riot_req_matches(urls: list[str]) -> list[Any]:
+    """riot_req_many for match detail urls, downloaded as one rusty-req batch when it is installed."""
+    if rusty_req is None:
+        return await riot_req_many(urls)
+
+    results = {url: _from_cache(url) for url in urls}
+    # Sorted so two overlapping batches always take the locks in the same order
+    missing = sorted({url for url, data in results.items() if data is _MISS})
+    async with AsyncExitStack() as stack:
+        for url in missing:
+            await stack.enter_async_context(_url_lock(url))
+        # Someone else may have downloaded some of them while we waited for the locks
+        for url in missing:
+            results[url] = _from_cache(url)
+        missing = [url for url in missing if results[url] is _MISS]
+        for _ in missing:
+            await _acquire_rate_limit()
+        # rusty-req runs the whole batch on its own Rust client, outside the Python event loop
+        responses = await rusty_req.fetch_requests(
+            [
+                rusty_req.RequestItem(url=url, method="GET", headers={"X-Riot-Token": RIOT_API_KEY or ""}, tag=url, timeout=30.0)
+                for url in missing
+            ],
+            total_timeout=30.0,
+            mode=rusty_req.ConcurrencyMode.JOIN_ALL,
+        ) if missing else []
+        retry = []
+        for response in responses:
+            url = response["meta"]["tag"]
+            status = response.get("http_status")
+            if status == 200:
+                try:
+                    data = orjson.loads(orjson.loads(response["response"])["content"])
+                except orjson.JSONDecodeError:
+                    results[url] = RiotError("Invalid response from Riot API")
+                    continue
+                _store(url, data)
+                results[url] = data
+            elif status in _STATUS_MESSAGES:
+                results[url] = RiotError(_STATUS_MESSAGES[status])
+            else:
+                retry.append(url)
+        # Rate limits, 5xx and connection errors get the same retries as any other request, still under the url locks
+        results.update(zip(retry, await asyncio.gather(*(_fetch_or_error(url) for url in retry))))
+    return [results[url] for url in urls]
+
+async def _fetch_or_error(url: str) -> Any:
+    try:
+        data = await _fetch(url)
+    except RiotError as e:
+        return e
+    _store(url, data)
+    return data
+
+def _retry_after(response: httpx.Response) -> float | None:
+    """The Retry-After header in seconds, None when Riot did not send a usable one."""
+    try:
+        retry_after = float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+    return retry_after if math.isfinite(retry_after) and retry_after >= 0 else None
+
+async def _fetch(url: str) -> Any:
+    for attempt in range(MAX_RETRIES):
+        last_attempt = attempt == MAX_RETRIES - 1
+        wait = RETRY_BACKOFF * 2**attempt
         try:
-            response = await client.get(url,headers=headers,timeout=30.0)
-            if response.status_code == 429:
-                retry_after = response.headers.get("Retry-After", "unknown")
-                return {"error": True, "message":f"Rate limit hit. Retry after {retry_after} seconds."}
-            elif response.status_code == 404:
-                return {"error":True,"message":"Resource not found"}
-            elif response.status_code == 403:
-                return {"error": True, "message": "Invalid or expired API key."}
-            elif response.status_code == 401:
-                return {"error": True, "message": "Unauthorized. Check your API key."}
-
-            response.raise_for_status()
-            return response.json()
+            async with _CLIENT.stream("GET", url) as response:
+                if response.status_code == 429:
+                    retry_after = _retry_after(response)
+                    shown = "unknown" if retry_after is None else f"{retry_after:g}"
+                    error = RiotError(f"Rate limit hit. Retry after {shown} seconds.")
+                    # Without a usable header keep the local backoff for the sleep
+                    if retry_after is not None:
+                        wait = retry_after
+                    # Waiting out a long window would stall the tool call, so let the caller decide instead
+                    if wait > MAX_RETRY_WAIT:
+                        raise error
+                elif response.status_code in _STATUS_MESSAGES:
+                    raise RiotError(_STATUS_MESSAGES[response.status_code])
+                elif response.status_code >= 500:
+                    # Riot's servers regularly answer 500/503 for a moment, worth another try
+                    error = RiotError(f"Riot API error {response.status_code}")
+                else:
+                    response.raise_for_status()
+                    if url.endswith("/timeline"):
+                        return await _read_timeline(response)
+                    return orjson.loads(await response.aread())
+        except httpx.HTTPStatusError as e:
+            raise RiotError(f"Riot API error {e.response.status_code}") from e
+        except (orjson.JSONDecodeError, ijson.JSONError) as e:
+            # e.g. an HTML error page from a proxy in front of Riot
+            raise RiotError("Invalid response from Riot API") from e
         except httpx.TimeoutException:
-            return {"error":True,"message":"Request timeout"}
+            error = RiotError("Request timeout")
         except httpx.RequestError as e:
-            return {"error":True,"message":f"Network error {str(e)}"}
-            
-        
+            error = RiotError(f"Network error {str(e)}")
+        if last_attempt:
+            raise error
+        # Sleep only once the response is closed so its connection goes back to the pool meanwhile
+        await asyncio.sleep(wait)
+
+
+class _ByteStream:
+    """The async read() ijson expects, on top of an httpx response body."""
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+
+    async def read(self, size: int = -1) -> bytes:
+        if size == 0:
+            return b""
+        return await anext(self._chunks, b"")
+
+async def _read_timeline(response: httpx.Response) -> dict[str, Any]:
+    # Timelines are several MB, mostly participantFrames and events the timeline tool never shows.
+    # Parse the body while it downloads and only build the participants and the events we keep,
+    # returning them in the same shape as the Riot response
+    info: dict[str, Any] = {"frameInterval": 0, "participants": [], "frames": []}
+    builder, building = None, None
+    timestamp, events = 0, []
+    async for prefix, event, value in ijson.parse_async(_ByteStream(response), use_float=True):
+        if building is not None:
+            builder.event(event, value)
+            if event == "end_map" and prefix == building:
+                if building == "info.participants.item":
+                    info["participants"].append(builder.value)
+                elif builder.value.get("type") in _WANTED:
+                    events.append(builder.value)
+                building = None
+        elif event == "start_map" and prefix in ("info.participants.item", "info.frames.item.events.item"):
+            builder, building = ijson.ObjectBuilder(), prefix
+            builder.event(event, value)
+        elif prefix == "info.frames.item":
+            if event == "start_map":
+                timestamp, events = 0, []
+            elif event == "end_map":
+                info["frames"].append({"timestamp": timestamp, "events": events})
+        elif prefix == "info.frames.item.timestamp":
+            timestamp = value
+        elif prefix == "info.frameInterval":
+            info["frameInterval"] = value
+    return {"info": info}
+
 @mcp.tool()
 async def get_player_id(region: str,name: str, tag_line: str) -> str:
     """
     Remember urls are always in lowercase
     Tries to find the id of a player by looking up their name and tag.
     """
+    if region not in _REGIONS:
+        return _INVALID_REGION
     url = f"{REGIONAL_URLS[region]}/riot/account/v1/accounts/by-riot-id/{name}/{tag_line}"
-    data = await riot_req(url)
-    if not data:
-        return "Found no account with that name in the server"
-    if data.get("error"):
-        return data["message"]
+    try:
+        data = await riot_req(url)
+    except RiotError as e:
+        return e.message
     return f"Name:{data['gameName']}#{data['tagLine']} PUUID: {data['puuid']}"
 
 @mcp.tool()
@@ -72,18 +390,23 @@ async def get_champion_masteries(uuid: str, region: str) -> str:
     Remember urls are always in lowercase
     Tries to find masteries of champions on account based on id and region
     """
+    if region not in _REGIONS:
+        return _INVALID_REGION
     url = f"{PLATFORM_URLS[region]}/lol/champion-mastery/v4/champion-masteries/by-puuid/{uuid}"
-    data = await riot_req(url)
-    if isinstance(data, dict) and data.get("error"):
-        return data["message"]
+    try:
+        data = await riot_req(url)
+    except RiotError as e:
+        return e.message
     if not data:
         return "Account does not exist on region"
     
+    return "\n".join(_mastery_lines(data))
+
+def _mastery_lines(data: list[dict[str, Any]]) -> list[str]:
     results = []
     for mastery in data[:10]:  # top 10 so we don't flood Claude
         results.append(f"Champion {mastery['championId']}: Level {mastery['championLevel']} - {mastery['championPoints']} pts")
-    
-    return "\n".join(results)
+    return results
 
 @mcp.tool()
 async def get_newest_matches(region:str, uuid:str, numberOfGames: int) -> str:
@@ -91,15 +414,61 @@ async def get_newest_matches(region:str, uuid:str, numberOfGames: int) -> str:
     Remember urls are always in lowercase
     Tries to find newest matches for player based on ID
     """
+    if region not in _REGIONS:
+        return _INVALID_REGION
     url = f"{REGIONAL_URLS[region]}/lol/match/v5/matches/by-puuid/{uuid}/ids?count={numberOfGames}"
-    data = await riot_req(url)
-    if isinstance(data, dict) and data.get("error"):
-        return data["message"]
+    try:
+        data = await riot_req(url)
+    except RiotError as e:
+        return e.message
     if not data:
         return "Account has no matches or does not exist"
-    results = []
-    for match_id in data[:numberOfGames]:
-        results.append(match_id)
+    # count already limits the list server side
+    return "\n".join(data)
+
+@mcp.tool()
+async def get_player_summary(region: str, name: str, tag_line: str, numberOfGames: int = 5) -> str:
+    """
+    Remember urls are always in lowercase
+    Looks up a player by name and tag and returns their id, top champion masteries and how they did in their newest matches in one call
+    """
+    if region not in _REGIONS:
+        return _INVALID_REGION
+    url = f"{REGIONAL_URLS[region]}/riot/account/v1/accounts/by-riot-id/{name}/{tag_line}"
+    try:
+        account = await riot_req(url)
+    except RiotError as e:
+        return e.message
+    puuid = account["puuid"]
+
+    # Masteries and the match list only need the puuid, so fetch them side by side
+    masteries, match_ids = await riot_req_many([
+        f"{PLATFORM_URLS[region]}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}",
+        f"{REGIONAL_URLS[region]}/lol/match/v5/matches/by-puuid/{puuid}/ids?count={numberOfGames}",
+    ])
+    results = [f"Name:{account['gameName']}#{account['tagLine']} PUUID: {puuid}", "Top champions:"]
+    if isinstance(masteries, RiotError):
+        results.append(masteries.message)
+    else:
+        results.extend(_mastery_lines(masteries))
+
+    results.append("Newest matches:")
+    if isinstance(match_ids, RiotError):
+        results.append(match_ids.message)
+        return "\n".join(results)
+    matches = await riot_req_matches([f"{REGIONAL_URLS[region]}/lol/match/v5/matches/{match_id}" for match_id in match_ids])
+    for match_id, match in zip(match_ids, matches):
+        if isinstance(match, RiotError):
+            results.append(f"{match_id}: {match.message}")
+            continue
+        info = match["info"]
+        p = next((p for p in info["participants"] if p["puuid"] == puuid), None)
+        if p is None:
+            continue
+        results.append(
+            f"{match_id}: {info['gameMode']} - {info['gameDuration'] // 60}min - {p['championName']} - {p['teamPosition']} "
+            f"{p['kills']}/{p['deaths']}/{p['assists']} - {'Win' if p['win'] else 'Loss'}"
+        )
     return "\n".join(results)
 
 @mcp.tool()
@@ -108,12 +477,15 @@ async def get_match_by_id(region: str,match_id:str):
     Remember urls are always in lowercase usernames and champion names to refer to players
     Finds match by ID and finds stats
     """
+    if region not in _REGIONS:
+        return _INVALID_REGION
+    if not _MATCH_RE.fullmatch(match_id):
+        return _INVALID_MATCH_ID
     url = f"{REGIONAL_URLS[region]}/lol/match/v5/matches/{match_id}"
-    data = await riot_req(url)
-    if not data:
-        return "Match does not exist"
-    if data.get("error"):
-        return data["message"]
+    try:
+        data = await riot_req(url)
+    except RiotError as e:
+        return e.message
     info = data["info"]
     results = [f"Mode: {info['gameMode']} - Duration: {info['gameDuration'] // 60}min"]
 
@@ -131,73 +503,95 @@ async def get_match_timeline_by_id(region: str,match_id:str):
     Remember urls are always in lowercase use usernames and champion names to refer to players
     Finds match timeline by ID, returning key events (kills, building destroys, elite monsters, items and level ups)
     """
-    url = f"{REGIONAL_URLS[region]}/lol/match/v5/matches/{match_id}/timeline"
-    data = await riot_req(url)
-    if not data:
-        return "Match does not exist"
-    if data.get("error"):
-        return data["message"]
+    if region not in _REGIONS:
+        return _INVALID_REGION
+    if not _MATCH_RE.fullmatch(match_id):
+        return _INVALID_MATCH_ID
+    match_url = f"{REGIONAL_URLS[region]}/lol/match/v5/matches/{match_id}"
+    participant_labels = _LABELS_CACHE.get(match_id)
+    if participant_labels is None:
+        # Timeline participants only carry ids, the names come from the match details (cached for good once fetched)
+        data, match = await riot_req_many([f"{match_url}/timeline", match_url])
+    else:
+        data, match = await _riot_req_or_error(f"{match_url}/timeline"), None
+    if isinstance(data, RiotError):
+        return data.message
 
     info = data.get("info", {})
-    frames = info.get("frames", [])
-    participant_map = {}
-    for p in info.get("participants"):
-        pid=p["participantId"]
-        participant_map[pid]={
-            "name": p.get("riotIdGameName") or p.get("summonerName") or f"Player {pid}",
-            "champion": p.get("championName", "Unknown")
-        }
-    def get_label(pid):
-        p = participant_map.get(pid,{})
-        return f"{p.get('name', '?')}({p.get('champion','?')})"
-
-    results = [f"Match: {match_id} - Frame interval: {info.get('frameInterval', 0) // 1000}s"]
+    if participant_labels is None:
+        if isinstance(match, RiotError):
+            # Label by participant id this time and try the match details again on the next call
+            participant_labels = _participant_labels(info.get("participants"))
+        else:
+            participant_labels = _participant_labels(match["info"]["participants"])
+            if len(_LABELS_CACHE) >= _LABELS_CACHE_SIZE:
+                del _LABELS_CACHE[next(iter(_LABELS_CACHE))]  # forget the oldest match
+            _LABELS_CACHE[match_id] = participant_labels
 
-    for frame in frames:
-        timestamp = frame.get("timestamp", 0) // 1000
-        minutes = timestamp // 60
-        seconds = timestamp % 60
-        for event in frame.get("events", []):
-            etype = event.get("type")
-            if etype == "CHAMPION_KILL":
-                killer = event.get("killerId", 0)
-                victim = event.get("victimId", 0)
-                assists = event.get("assistingParticipantIds", [])
-                results.append(
-                    f"[{minutes:02d}:{seconds:02d}] KILL - Player {get_label(killer)} killed Player {get_label(victim)} "
-                    f"(assists: {assists})"
-                )
-            elif etype == "BUILDING_KILL":
-                team = event.get("teamId", 0)
-                team_map = {100: "Blue Team", 200: "Red Team"}
-                building = event.get("buildingType", "")
-                lane = event.get("laneType", "")
-                results.append(
-                    f"[{minutes:02d}:{seconds:02d}] BUILDING - Team {team_map[team]} lost {building} ({lane})"
-                )
-            elif etype == "ELITE_MONSTER_KILL":
-                killer = event.get("killerId", 0)
-                monster = event.get("monsterType", "")
-                subtype = event.get("monsterSubType", "")
-                results.append(
-                    f"[{minutes:02d}:{seconds:02d}] MONSTER - Player {get_label(killer)} killed {monster} {subtype}"
-                )
-            elif etype == "ITEM_PURCHASED":
-                participant = event.get("participantId", 0)
-                item_id = event.get("itemId", 0)
-                results.append(
-                    f"[{minutes:02d}:{seconds:02d}] ITEM - Player {get_label(participant)} purchased item {item_id}"
-                )
-            elif etype == "SKILL_LEVEL_UP":
-                participant = event.get("participantId", 0)
-                skill_slot = event.get("skillSlot",0)
-                slot_map = {1: "Q",2: "W", 3:"E", 4:"R"}
-                skill_name = slot_map.get(skill_slot,str(skill_slot))
-                results.append(
-                    f"[{minutes:02d}:{seconds:02d}] SKILL - Player {get_label(participant)} leveled up {skill_name}"
-                )
+    header = f"Match: {match_id} - Frame interval: {info.get('frameInterval', 0) // 1000}s"
+    # One join over the generator sizes the output once; writing each line to an io.StringIO measured several times slower
+    return "\n".join(_iter_events(header, info.get("frames", ()), participant_labels))
 
-    return "\n".join(results)
+_TEAM_MAP = {100: "Blue Team", 200: "Red Team"}
+_SKILL_MAP = {1: "Q", 2: "W", 3: "E", 4: "R"}
+_UNKNOWN_LABEL = "?(?)"  # participant id missing from the match
+_NAMELESS_PLAYER = "Player %d"
+
+# match_id -> participantId -> "name(champion)", built from the match details participants
+_LABELS_CACHE: dict[str, dict[int,str]] = {}
+_LABELS_CACHE_SIZE = 256
+
+def _participant_labels(participants: list[dict[str, Any]]) -> dict[int,str]:
+    participant_labels = {}
+    for p in participants:
+        pid = p["participantId"]
+        name = p.get("riotIdGameName") or p.get("summonerName") or _NAMELESS_PLAYER % pid
+        participant_labels[pid] = f"{name}({p.get('championName', 'Unknown')})"
+    return participant_labels
+
+def _format_champion_kill(event: dict[str, Any], ts: str, labels: dict[int,str]) -> str:
+    killer = labels.get(event.get("killerId", 0), _UNKNOWN_LABEL)
+    victim = labels.get(event.get("victimId", 0), _UNKNOWN_LABEL)
+    assists = event.get("assistingParticipantIds", [])
+    return f"{ts} KILL - Player {killer} killed Player {victim} (assists: {assists})"
+
+def _format_building_kill(event: dict[str, Any], ts: str, labels: dict[int,str]) -> str:
+    team = _TEAM_MAP[event.get("teamId", 0)]
+    return f"{ts} BUILDING - Team {team} lost {event.get('buildingType', '')} ({event.get('laneType', '')})"
+
+def _format_elite_monster_kill(event: dict[str, Any], ts: str, labels: dict[int,str]) -> str:
+    killer = labels.get(event.get("killerId", 0), _UNKNOWN_LABEL)
+    return f"{ts} MONSTER - Player {killer} killed {event.get('monsterType', '')} {event.get('monsterSubType', '')}"
+
+def _format_item_purchased(event: dict[str, Any], ts: str, labels: dict[int,str]) -> str:
+    participant = labels.get(event.get("participantId", 0), _UNKNOWN_LABEL)
+    return f"{ts} ITEM - Player {participant} purchased item {event.get('itemId', 0)}"
+
+def _format_skill_level_up(event: dict[str, Any], ts: str, labels: dict[int,str]) -> str:
+    participant = labels.get(event.get("participantId", 0), _UNKNOWN_LABEL)
+    skill_slot = event.get("skillSlot", 0)
+    return f"{ts} SKILL - Player {participant} leveled up {_SKILL_MAP.get(skill_slot, str(skill_slot))}"
+
+# Timeline event type -> line formatter. Events of any other type are left out of the timeline
+_EVENT_FORMATTERS: dict[str, Callable[[dict[str, Any], str, dict[int,str]], str]] = {
+    "CHAMPION_KILL": _format_champion_kill,
+    "BUILDING_KILL": _format_building_kill,
+    "ELITE_MONSTER_KILL": _format_elite_monster_kill,
+    "ITEM_PURCHASED": _format_item_purchased,
+    "SKILL_LEVEL_UP": _format_skill_level_up,
+}
+# The event types _read_timeline keeps
+_WANTED = frozenset(_EVENT_FORMATTERS)
+
+def _iter_events(header: str, frames: list[dict[str, Any]], participant_labels: dict[int,str]) -> Iterator[str]:
+    yield header
+    for frame in frames:
+        minutes, seconds = divmod(frame.get("timestamp", 0) // 1000, 60)
+        ts = f"[{minutes:02d}:{seconds:02d}]"
+        for event in frame.get("events", ()):
+            formatter = _EVENT_FORMATTERS.get(event.get("type"))
+            if formatter:
+                yield formatter(event, ts, participant_labels)
 
 
 if __name__ == "__main__":